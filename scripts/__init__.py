@@ -7,6 +7,7 @@ from .auth import FeishuAuth
 from .uploader import FeishuImageUploader
 from .parser import MarkdownParser
 from .doc_writer import FeishuDocWriter
+from .rate_limiter import TokenBucket
 from .writer import FeishuWriter
 
 __all__ = [
@@ -15,4 +16,5 @@ __all__ = [
     'FeishuImageUploader',
     'FeishuWriter',
     'MarkdownParser',
+    'TokenBucket',
 ]
@@ -16,9 +16,11 @@ class FeishuAuth:
     TOKEN_URL = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
     REQUEST_TIMEOUT = 30  # 请求超时（秒）
 
-    def __init__(self, app_id: str, app_secret: str):
+    def __init__(self, app_id: str, app_secret: str, session: requests.Session = None):
         self.app_id = app_id
         self.app_secret = app_secret
+        # 获取 token 使用的 Session；与文档 API 共用时，后续请求可直接复用这里建立的连接
+        self.session = session or requests.Session()
         self._token: Optional[str] = None
         self._token_expiry: float = 0  # token 过期时间戳
         self._lock = threading.Lock()
@@ -30,7 +32,7 @@ class FeishuAuth:
             if self._token and time.time() + 60 < self._token_expiry:
                 return self._token
 
-            resp = requests.post(self.TOKEN_URL, json={
+            resp = self.session.post(self.TOKEN_URL, json={
                 "app_id": self.app_id,
                 "app_secret": self.app_secret
             }, timeout=self.REQUEST_TIMEOUT)
@@ -4,11 +4,33 @@
 """
 
 import time
-from typing import Dict, List, Tuple, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Any
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 from .auth import FeishuAuth
+from .log import logger
+from .rate_limiter import TokenBucket
+
+# 可选依赖 orjson：序列化更快且直接输出 bytes，未安装时退回标准库 json
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    import json
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _chunked(items: List, size: int) -> Iterator[Tuple[int, List]]:
+    """按接口单次上限切分批次，产出 (起始位置, 批次)"""
+    for offset in range(0, len(items), size):
+        yield offset, items[offset:offset + size]
 
 
 class FeishuDocWriter:
@@ -16,15 +38,89 @@ class FeishuDocWriter:
 
     BASE_URL = "https://open.feishu.cn/open-apis"
     REQUEST_TIMEOUT = 30  # HTTP 请求超时（秒）
+    MAX_WORKERS = 8  # 并发请求上限（兼顾飞书限流）
+    RATE_LIMIT_CODE = 99991400  # 飞书限流错误码
+    RATE_LIMIT_RETRIES = 5  # 触发限流时的最大重试次数
+    RATE_LIMIT_QPS = 5.0  # 客户端令牌桶的稳定速率
+    RATE_LIMIT_BURST = 10  # 令牌桶容量（允许的突发请求数）
+    TABLE_READY_TIMEOUT = 5  # 等待新建表格单元格就绪的最长时间（秒）
+    APPEND_BATCH_SIZE = 50  # 创建子块每次最多 50 个
+    BATCH_UPDATE_SIZE = 200  # batch_update 每次最多 200 个请求
 
     def __init__(self, auth: FeishuAuth):
         self.auth = auth
+        self._session = self._create_session()
+        # 所有请求共享的令牌桶，只在真正接近限额时才等待
+        self._rate_limiter = TokenBucket(rate=self.RATE_LIMIT_QPS, capacity=self.RATE_LIMIT_BURST)
+        # 请求头缓存，仅在 token 轮换时重建
+        self._cached_token: Optional[str] = None
+        self._cached_headers: Optional[Dict] = None
+
+    @property
+    def session(self) -> requests.Session:
+        """文档 API 使用的 Session（keep-alive 连接池）"""
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        """创建复用连接的 Session（keep-alive + 连接池 + 传输层重试）"""
+        # 限流（429）只由 _request 退避重试，传输层不再重复重试；
+        # 5xx 只重试结果可重放的 GET/PATCH：POST 创建块、DELETE 按区间删除在服务端已生效时重放会重复执行，
+        # 这两类请求只在连接失败（请求尚未发出）时重试
+        retry = Retry(
+            total=5,
+            backoff_factor=0.3,
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=frozenset(["GET", "PATCH"]),
+            raise_on_status=False  # 重试耗尽后仍返回响应，由调用方 raise_for_status
+        )
+        session = requests.Session()
+        # 连接池与并发数一致且满时阻塞等待：并发请求复用同一组长连接，
+        # 不会因池满额外建立再丢弃的临时连接
+        session.mount("https://", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.MAX_WORKERS,
+            pool_block=True,
+            max_retries=retry
+        ))
+        # 所有接口均为 JSON（请求体由 _dumps 预先序列化），Content-Type 作为会话默认头
+        session.headers["Content-Type"] = "application/json; charset=utf-8"
+        return session
 
     def _headers(self) -> Dict:
-        return {
-            "Authorization": f"Bearer {self.auth.get_token()}",
-            "Content-Type": "application/json"
-        }
+        # get_token 在有效期内返回同一个字符串对象，身份比较即可判断是否轮换
+        token = self.auth.get_token()
+        if token is not self._cached_token:
+            self._cached_headers = {
+                "Authorization": f"Bearer {token}"
+            }
+            self._cached_token = token
+        return self._cached_headers
+
+    def _is_rate_limited(self, resp: requests.Response) -> bool:
+        """判断响应是否为限流（HTTP 429 或飞书限流错误码）"""
+        if resp.status_code == 429:
+            return True
+        # 成功响应不会是限流，不必解析响应体（调用方还会再解析一次）
+        if resp.status_code < 400:
+            return False
+        try:
+            return resp.json().get("code") == self.RATE_LIMIT_CODE
+        except ValueError:
+            return False
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        发送请求：先经令牌桶限流，仅在服务端仍返回限流时指数退避后重试
+        """
+        delay = 0.5
+        for attempt in range(self.RATE_LIMIT_RETRIES):
+            self._rate_limiter.acquire()
+            resp = self._session.request(method, url, headers=self._headers(), timeout=self.REQUEST_TIMEOUT, **kwargs)
+            if attempt == self.RATE_LIMIT_RETRIES - 1 or not self._is_rate_limited(resp):
+                return resp
+            time.sleep(delay)
+            delay *= 2
+        return resp
 
     def create_document(self, title: str, folder_token: Optional[str] = None) -> Tuple[str, str]:
         """
@@ -38,7 +134,7 @@ class FeishuDocWriter:
         if folder_token:
             data["folder_token"] = folder_token
 
-        resp = requests.post(url, headers=self._headers(), json=data, timeout=self.REQUEST_TIMEOUT)
+        resp = self._request("POST", url, data=_dumps(data))
         resp.raise_for_status()
         result = resp.json()
 
@@ -51,7 +147,7 @@ class FeishuDocWriter:
     def get_document_block_id(self, document_id: str) -> str:
         """获取文档的根 block_id"""
         url = f"{self.BASE_URL}/docx/v1/documents/{document_id}"
-        resp = requests.get(url, headers=self._headers(), timeout=self.REQUEST_TIMEOUT)
+        resp = self._request("GET", url)
         resp.raise_for_status()
         result = resp.json()
 
@@ -60,28 +156,103 @@ class FeishuDocWriter:
 
         return result.get("data", {}).get("document", {}).get("document_id")
 
-    def append_blocks(self, document_id: str, block_id: str, blocks: List[Dict]) -> bool:
-        """向文档追加内容块"""
+    def append_blocks(self, document_id: str, block_id: str, blocks: List[Dict], index: Optional[int] = None) -> bool:
+        """
+        向文档追加内容块
+
+        Args:
+            document_id: 文档 ID
+            block_id: 父块 ID
+            blocks: 要写入的块
+            index: 插入位置（可选，默认追加到末尾）
+
+        Returns:
+            是否全部写入成功
+        """
+        success, _ = self._create_in_batches(document_id, block_id, blocks, index)
+        return success
+
+    def create_children(self, document_id: str, block_id: str, blocks: List[Dict],
+                        index: Optional[int] = None,
+                        on_batch: Optional[Callable[[int, List[Dict]], None]] = None) -> List[Dict]:
+        """
+        向文档追加内容块，并返回创建出的块（含 block_id）
+
+        Args:
+            document_id: 文档 ID
+            block_id: 父块 ID
+            blocks: 要写入的块（可包含空图片块、表格块）
+            index: 插入位置（可选，默认追加到末尾）
+            on_batch: 每批创建成功后立即回调 (该批在 blocks 中的起始位置, 该批创建出的块)，
+                回调执行期间后续批次继续发送，调用方可借此尽早开始处理已创建的块
+
+        Returns:
+            按顺序创建出的块；某一批失败时只包含此前成功批次的块
+        """
+        _, created = self._create_in_batches(document_id, block_id, blocks, index, on_batch)
+        return created
+
+    def _create_in_batches(self, document_id: str, block_id: str, blocks: List[Dict],
+                           index: Optional[int],
+                           on_batch: Optional[Callable[[int, List[Dict]], None]] = None
+                           ) -> Tuple[bool, List[Dict]]:
+        """分批创建子块，返回 (是否全部成功, 已创建的块)"""
+        created = []
         if not blocks:
-            return True
+            return True, created
 
         url = f"{self.BASE_URL}/docx/v1/documents/{document_id}/blocks/{block_id}/children"
 
-        # 飞书 API 限制每次最多 50 个 block
-        batch_size = 50
-        for i in range(0, len(blocks), batch_size):
-            batch = blocks[i:i + batch_size]
-            data = {"children": batch}
-
-            resp = requests.post(url, headers=self._headers(), json=data, timeout=self.REQUEST_TIMEOUT)
+        # 同一父块下的批次必须按顺序落地（后一批的 index 依赖前一批已写入），且前一批确认成功后才发出下一批：
+        # 某批失败时不会有已发出却未返回的后续批次。请求在单独线程中发送，
+        # 等待期间主线程序列化下一批、执行上一批的 on_batch 回调
+        def bodies() -> Iterator[Tuple[int, int, bytes]]:
+            # 飞书 API 限制每次最多 50 个 block
+            for offset, batch in _chunked(blocks, self.APPEND_BATCH_SIZE):
+                data = {"children": batch}
+                if index is not None:
+                    data["index"] = index + offset
+                yield offset, len(batch), _dumps(data)
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            batches = bodies()
+            current = next(batches)
+            future = pool.submit(self._post_children, url, current[2])
+            while current:
+                upcoming = next(batches, None)
+                children = future.result()
+                offset, size, _ = current
+                if children is None:
+                    return False, created
+                # 返回的块数与请求不一致时无法与 blocks 一一对应，按失败处理
+                if len(children) != size:
+                    logger.warning("警告: 写入部分内容失败: 请求 %s 个块，返回 %s 个", size, len(children))
+                    return False, created
+
+                if upcoming:
+                    future = pool.submit(self._post_children, url, upcoming[2])
+                if on_batch:
+                    on_batch(offset, children)
+                created.extend(children)
+                current = upcoming
+
+        return True, created
+
+    def _post_children(self, url: str, body: bytes) -> Optional[List[Dict]]:
+        """发送一批子块创建请求，返回创建出的块，失败返回 None"""
+        try:
+            resp = self._request("POST", url, data=body)
             resp.raise_for_status()
             result = resp.json()
 
             if result.get("code") != 0:
-                print(f"警告: 写入部分内容失败: {result.get('msg')}")
-                return False
+                logger.warning("警告: 写入部分内容失败: %s", result.get('msg'))
+                return None
 
-        return True
+            return result.get("data", {}).get("children", [])
+        except Exception as e:
+            logger.warning("警告: 写入部分内容异常: %s", e)
+            return None
 
     def list_documents_in_folder(self, folder_token: str) -> List[Dict]:
         """列出文件夹中的文档（支持分页）"""
@@ -97,7 +268,7 @@ class FeishuDocWriter:
             if page_token:
                 params["page_token"] = page_token
 
-            resp = requests.get(url, headers=self._headers(), params=params, timeout=self.REQUEST_TIMEOUT)
+            resp = self._request("GET", url, params=params)
             resp.raise_for_status()
             result = resp.json()
 
@@ -118,7 +289,7 @@ class FeishuDocWriter:
         """清空文档内容（用于更新）"""
         # 获取文档所有 block
         url = f"{self.BASE_URL}/docx/v1/documents/{document_id}/blocks"
-        resp = requests.get(url, headers=self._headers(), timeout=self.REQUEST_TIMEOUT)
+        resp = self._request("GET", url)
         resp.raise_for_status()
         result = resp.json()
 
@@ -127,20 +298,30 @@ class FeishuDocWriter:
 
         blocks = result.get("data", {}).get("items", [])
 
-        # 删除所有子 block（跳过根 block）
-        for block in blocks:
-            block_id = block.get("block_id")
-            if block_id and block_id != document_id:
-                delete_url = f"{self.BASE_URL}/docx/v1/documents/{document_id}/blocks/{block_id}"
-                del_resp = requests.delete(delete_url, headers=self._headers(), timeout=self.REQUEST_TIMEOUT)
-                if del_resp.status_code < 200 or del_resp.status_code >= 300:
-                    print(f"警告: 删除 block {block_id} 失败: status={del_resp.status_code}, body={del_resp.text}")
-                    return False
-                del_result = del_resp.json()
-                if del_result.get("code") != 0:
-                    print(f"警告: 删除 block {block_id} API 错误: {del_result.get('msg')}")
-                    return False
+        # 删除所有子 block（跳过根 block），并发发送删除请求
+        block_ids = [
+            block.get("block_id") for block in blocks
+            if block.get("block_id") and block.get("block_id") != document_id
+        ]
+        if not block_ids:
+            return True
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as pool:
+            results = list(pool.map(lambda bid: self._delete_block(document_id, bid), block_ids))
 
+        return all(results)
+
+    def _delete_block(self, document_id: str, block_id: str) -> bool:
+        """删除单个 block"""
+        delete_url = f"{self.BASE_URL}/docx/v1/documents/{document_id}/blocks/{block_id}"
+        del_resp = self._request("DELETE", delete_url)
+        if del_resp.status_code < 200 or del_resp.status_code >= 300:
+            logger.warning("警告: 删除 block %s 失败: status=%s, body=%s", block_id, del_resp.status_code, del_resp.text)
+            return False
+        del_result = del_resp.json()
+        if del_result.get("code") != 0:
+            logger.warning("警告: 删除 block %s API 错误: %s", block_id, del_result.get('msg'))
+            return False
         return True
 
     def move_to_wiki(self, document_id: str, space_id: str, parent_node_token: Optional[str] = None) -> bool:
@@ -160,7 +341,7 @@ class FeishuDocWriter:
         if parent_node_token:
             data["parent_node_token"] = parent_node_token
 
-        resp = requests.post(url, headers=self._headers(), json=data, timeout=self.REQUEST_TIMEOUT)
+        resp = self._request("POST", url, data=_dumps(data))
         resp.raise_for_status()
         result = resp.json()
 
@@ -186,7 +367,7 @@ class FeishuDocWriter:
         if parent_node_token:
             data["parent_node_token"] = parent_node_token
 
-        resp = requests.post(url, headers=self._headers(), json=data, timeout=self.REQUEST_TIMEOUT)
+        resp = self._request("POST", url, data=_dumps(data))
         resp.raise_for_status()
         result = resp.json()
 
@@ -204,7 +385,7 @@ class FeishuDocWriter:
         url = f"{self.BASE_URL}/wiki/v2/spaces/get_node"
         params = {"token": node_token}
 
-        resp = requests.get(url, headers=self._headers(), params=params, timeout=self.REQUEST_TIMEOUT)
+        resp = self._request("GET", url, params=params)
         if resp.status_code != 200:
             return None
 
@@ -214,6 +395,24 @@ class FeishuDocWriter:
 
         return result.get("data", {}).get("node", {}).get("space_id")
 
+    @staticmethod
+    def image_block() -> Dict:
+        """空图片块（占位，上传图片后回填 token）"""
+        return {"block_type": 27, "image": {}}
+
+    @staticmethod
+    def table_block(rows: int, cols: int) -> Dict:
+        """空表格块（创建后单元格自动生成）"""
+        return {
+            "block_type": 31,
+            "table": {
+                "property": {
+                    "row_size": rows,
+                    "column_size": cols
+                }
+            }
+        }
+
     def create_image_block(self, document_id: str, block_id: str) -> Optional[str]:
         """
         创建空的图片块占位符
@@ -226,22 +425,15 @@ class FeishuDocWriter:
             创建的图片块 block_id，失败返回 None
         """
         url = f"{self.BASE_URL}/docx/v1/documents/{document_id}/blocks/{block_id}/children"
-        data = {
-            "children": [
-                {
-                    "block_type": 27,
-                    "image": {}
-                }
-            ]
-        }
+        data = {"children": [self.image_block()]}
 
         try:
-            resp = requests.post(url, headers=self._headers(), json=data, timeout=self.REQUEST_TIMEOUT)
+            resp = self._request("POST", url, data=_dumps(data))
             resp.raise_for_status()
             result = resp.json()
 
             if result.get("code") != 0:
-                print(f"警告: 创建图片块失败: {result.get('msg')}")
+                logger.warning("警告: 创建图片块失败: %s", result.get('msg'))
                 return None
 
             # 返回创建的图片块 block_id
@@ -250,7 +442,7 @@ class FeishuDocWriter:
                 return children[0].get("block_id")
             return None
         except Exception as e:
-            print(f"警告: 创建图片块异常: {e}")
+            logger.warning("警告: 创建图片块异常: %s", e)
             return None
 
     def replace_image_token(self, document_id: str, block_id: str, file_token: str) -> bool:
@@ -273,19 +465,36 @@ class FeishuDocWriter:
         }
 
         try:
-            resp = requests.patch(url, headers=self._headers(), json=data, timeout=self.REQUEST_TIMEOUT)
+            resp = self._request("PATCH", url, data=_dumps(data))
             resp.raise_for_status()
             result = resp.json()
 
             if result.get("code") != 0:
-                print(f"警告: 更新图片块失败: {result.get('msg')}")
+                logger.warning("警告: 更新图片块失败: %s", result.get('msg'))
                 return False
 
             return True
         except Exception as e:
-            print(f"警告: 更新图片块异常: {e}")
+            logger.warning("警告: 更新图片块异常: %s", e)
             return False
 
+    def replace_image_tokens(self, document_id: str, image_tokens: Dict[str, str]) -> bool:
+        """
+        批量更新多个图片块的 token，一次 batch_update 请求代替逐个 PATCH
+
+        Args:
+            document_id: 文档 ID
+            image_tokens: {图片块 ID: file_token}
+
+        Returns:
+            是否全部成功
+        """
+        update_requests = [
+            {"block_id": block_id, "replace_image": {"token": file_token}}
+            for block_id, file_token in image_tokens.items()
+        ]
+        return self.batch_update_blocks(document_id, update_requests)
+
     def create_table(self, document_id: str, block_id: str, rows: int, cols: int) -> Optional[str]:
         """
         创建表格块
@@ -300,27 +509,15 @@ class FeishuDocWriter:
             创建的表格块 block_id，失败返回 None
         """
         url = f"{self.BASE_URL}/docx/v1/documents/{document_id}/blocks/{block_id}/children"
-        data = {
-            "children": [
-                {
-                    "block_type": 31,
-                    "table": {
-                        "property": {
-                            "row_size": rows,
-                            "column_size": cols
-                        }
-                    }
-                }
-            ]
-        }
+        data = {"children": [self.table_block(rows, cols)]}
 
         try:
-            resp = requests.post(url, headers=self._headers(), json=data, timeout=self.REQUEST_TIMEOUT)
+            resp = self._request("POST", url, data=_dumps(data))
             resp.raise_for_status()
             result = resp.json()
 
             if result.get("code") != 0:
-                print(f"警告: 创建表格失败: {result.get('msg')}")
+                logger.warning("警告: 创建表格失败: %s", result.get('msg'))
                 return None
 
             children = result.get("data", {}).get("children", [])
@@ -328,52 +525,102 @@ class FeishuDocWriter:
                 return children[0].get("block_id")
             return None
         except Exception as e:
-            print(f"警告: 创建表格异常: {e}")
+            logger.warning("警告: 创建表格异常: %s", e)
             return None
 
     def get_table_cells(self, document_id: str, table_block_id: str) -> List[Dict[str, Any]]:
         """
         获取表格的所有单元格信息
 
+        飞书表格的子块直接就是单元格（按行优先顺序排列），分页拉取一次即可
+
         Args:
             document_id: 文档 ID
             table_block_id: 表格块 ID
 
         Returns:
-            单元格列表，每个元素包含 block_id 和位置信息
+            单元格列表，每个元素包含 block_id 和其子块 children
         """
         url = f"{self.BASE_URL}/docx/v1/documents/{document_id}/blocks/{table_block_id}/children"
+        cells = []
+        page_token = None
 
         try:
-            resp = requests.get(url, headers=self._headers(), timeout=self.REQUEST_TIMEOUT)
-            resp.raise_for_status()
-            result = resp.json()
+            while True:
+                params = {"page_size": 500}
+                if page_token:
+                    params["page_token"] = page_token
 
-            if result.get("code") != 0:
-                print(f"警告: 获取表格子块失败: {result.get('msg')}")
-                return []
+                resp = self._request("GET", url, params=params)
+                resp.raise_for_status()
+                result = resp.json()
 
-            # 获取所有行
-            rows = result.get("data", {}).get("items", [])
-            cells = []
+                if result.get("code") != 0:
+                    logger.warning("警告: 获取表格单元格失败: %s", result.get('msg'))
+                    return []
 
-            # 遍历每一行获取单元格
-            for row in rows:
-                row_id = row.get("block_id")
-                row_children_url = f"{self.BASE_URL}/docx/v1/documents/{document_id}/blocks/{row_id}/children"
-                row_resp = requests.get(row_children_url, headers=self._headers(), timeout=self.REQUEST_TIMEOUT)
-                row_resp.raise_for_status()
-                row_result = row_resp.json()
+                cells.extend(result.get("data", {}).get("items", []))
 
-                if row_result.get("code") == 0:
-                    row_cells = row_result.get("data", {}).get("items", [])
-                    cells.extend(row_cells)
+                # 检查是否有下一页
+                if result.get("data", {}).get("has_more"):
+                    page_token = result.get("data", {}).get("page_token")
+                else:
+                    break
 
             return cells
         except Exception as e:
-            print(f"警告: 获取表格单元格异常: {e}")
+            logger.warning("警告: 获取表格单元格异常: %s", e)
             return []
 
+    def _wait_for_table_cells(self, document_id: str, table_block_id: str, expected: int) -> List[Dict[str, Any]]:
+        """轮询表格单元格直到数量就绪，间隔从 10ms 指数增长，最长 500ms"""
+        delay = 0.01
+        deadline = time.monotonic() + self.TABLE_READY_TIMEOUT
+        while True:
+            cells = self.get_table_cells(document_id, table_block_id)
+            if len(cells) >= expected or time.monotonic() >= deadline:
+                return cells
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    def batch_update_blocks(self, document_id: str, update_requests: List[Dict]) -> bool:
+        """
+        批量更新块内容（batch_update 接口）
+
+        Args:
+            document_id: 文档 ID
+            update_requests: 更新请求列表，如 [{"block_id": ..., "update_text_elements": {...}}, ...]
+
+        Returns:
+            是否全部成功
+        """
+        return self._batch_update(document_id, update_requests) == len(update_requests)
+
+    def _batch_update(self, document_id: str, update_requests: List[Dict]) -> int:
+        """
+        按批发送更新请求，遇到失败的批次即停止
+
+        Returns:
+            已生效的请求数：update_requests[:返回值] 已更新，其后的请求均未生效
+        """
+        url = f"{self.BASE_URL}/docx/v1/documents/{document_id}/blocks/batch_update"
+
+        applied = 0
+        try:
+            for offset, batch in _chunked(update_requests, self.BATCH_UPDATE_SIZE):
+                data = {"requests": batch}
+                resp = self._request("PATCH", url, data=_dumps(data))
+                resp.raise_for_status()
+                result = resp.json()
+
+                if result.get("code") != 0:
+                    logger.warning("警告: 批量更新块失败: %s", result.get('msg'))
+                    break
+                applied = offset + len(batch)
+        except Exception as e:
+            logger.warning("警告: 批量更新块异常: %s", e)
+        return applied
+
     def fill_table_cell(self, document_id: str, cell_block_id: str, content: str) -> bool:
         """
         填充表格单元格内容
@@ -405,21 +652,22 @@ class FeishuDocWriter:
         }
 
         try:
-            resp = requests.post(url, headers=self._headers(), json=data, timeout=self.REQUEST_TIMEOUT)
+            resp = self._request("POST", url, data=_dumps(data))
             resp.raise_for_status()
             result = resp.json()
 
             if result.get("code") != 0:
                 # 输出详细错误信息用于调试
-                print(f"填充单元格失败: code={result.get('code')}, msg={result.get('msg')}")
+                logger.warning("填充单元格失败: code=%s, msg=%s", result.get('code'), result.get('msg'))
                 return False
 
             return True
         except Exception as e:
-            print(f"填充单元格异常: {e}")
+            logger.warning("填充单元格异常: %s", e)
             return False
 
-    def fill_table(self, document_id: str, table_block_id: str, table_data: List[List[str]]) -> bool:
+    def fill_table(self, document_id: str, table_block_id: str, table_data: List[List[str]],
+                   cols: Optional[int] = None) -> bool:
         """
         填充整个表格内容
 
@@ -427,53 +675,56 @@ class FeishuDocWriter:
             document_id: 文档 ID
             table_block_id: 表格块 ID
             table_data: 二维数组，表格数据
+            cols: 表格列数，调用方已知时传入可免去重新计算
 
         Returns:
             是否成功
         """
         try:
-            # 等待表格创建完成
-            time.sleep(0.5)
-
-            # 获取表格的所有单元格（飞书表格的子块直接就是单元格，按行优先顺序排列）
-            url = f"{self.BASE_URL}/docx/v1/documents/{document_id}/blocks/{table_block_id}/children"
-            resp = requests.get(url, headers=self._headers(), timeout=self.REQUEST_TIMEOUT)
-            resp.raise_for_status()
-            result = resp.json()
-
-            if result.get("code") != 0:
-                print(f"警告: 获取表格单元格失败: {result.get('msg')}")
+            # 获取表格的所有单元格（按行优先顺序排列），新建表格的单元格未就绪时短暂轮询
+            if cols is None:
+                cols = max(len(row) for row in table_data) if table_data else 0
+            cells = self._wait_for_table_cells(document_id, table_block_id, len(table_data) * cols)
+            if not cells:
                 return False
 
-            cells = result.get("data", {}).get("items", [])
-
-            # 计算表格尺寸
-            rows = len(table_data)
-            cols = max(len(row) for row in table_data) if table_data else 0
-
-            # 按行优先顺序填充单元格
-            for row_idx in range(rows):
-                for col_idx in range(cols):
-                    cell_index = row_idx * cols + col_idx
-
-                    if cell_index >= len(cells):
-                        break
+            # 按列数补齐短行后展平，与按行优先排列的单元格一一对应
+            padded_rows = (row + [""] * (cols - len(row)) for row in table_data)
+
+            # 新建单元格自带一个空文本块，直接批量更新其内容，整张表只需 O(1) 次请求
+            updates = []
+            updated = []  # 与 updates 一一对应的 (行, 列, 单元格 ID, 内容)
+            fallback = []
+            for pos, (cell, content) in enumerate(zip(cells, chain.from_iterable(padded_rows))):
+                if not content:
+                    continue
+                item = (*divmod(pos, cols), cell.get("block_id"), content)
+                children = cell.get("children") or []
+                if children:
+                    updates.append({
+                        "block_id": children[0],
+                        "update_text_elements": {
+                            "elements": [{"text_run": {"content": content}}]
+                        }
+                    })
+                    updated.append(item)
+                else:
+                    fallback.append(item)
 
-                    if col_idx >= len(table_data[row_idx]):
-                        continue
+            # 某一批更新失败时，只对尚未生效的单元格退回逐个追加，已更新的单元格不再重复写入
+            applied = self._batch_update(document_id, updates)
+            fallback.extend(updated[applied:])
 
-                    cell_block = cells[cell_index]
-                    cell_id = cell_block.get("block_id")
-                    content = table_data[row_idx][col_idx]
+            # 单元格之间互不依赖，并发填充（由 _request 统一限流）
+            def fill(item):
+                row_idx, col_idx, cell_id, content = item
+                if not self.fill_table_cell(document_id, cell_id, content):
+                    logger.warning("警告: 填充单元格 [%s][%s] 失败", row_idx, col_idx)
 
-                    if content:
-                        success = self.fill_table_cell(document_id, cell_id, content)
-                        if not success:
-                            print(f"警告: 填充单元格 [{row_idx}][{col_idx}] 失败")
-                        # 添加小延时避免 API 限流
-                        time.sleep(0.1)
+            with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as pool:
+                list(pool.map(fill, fallback))
 
             return True
         except Exception as e:
-            print(f"警告: 填充表格异常: {e}")
+            logger.warning("警告: 填充表格异常: %s", e)
             return False
@@ -12,6 +12,7 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
+from .log import flush_logging, logger, setup_logging
 from .writer import FeishuWriter
 
 
@@ -19,6 +20,7 @@ def main():
     """主函数"""
     # 先加载环境变量
     load_dotenv()
+    setup_logging()
 
     arg_parser = argparse.ArgumentParser(
         description="将 Markdown 文件写入飞书文档",
@@ -49,6 +51,8 @@ def main():
     arg_parser.add_argument("--folder-token", "-f", help="文件夹 token")
     arg_parser.add_argument("--wiki-token", "-w", help="知识库 token")
     arg_parser.add_argument("--no-check-duplicate", action="store_true", help="不检查重复文档")
+    arg_parser.add_argument("--no-cache-downloads", action="store_true",
+                            help="网络图片只下载到内存直接上传，不保存到缓存目录")
     arg_parser.add_argument(
         "--on-duplicate",
         choices=["ask", "update", "skip", "new"],
@@ -72,18 +76,18 @@ def main():
 
     # 验证参数
     if args.target == "folder" and not args.folder_token and not os.getenv("FEISHU_DEFAULT_FOLDER_TOKEN"):
-        print("错误: 目标为 folder 时必须指定 --folder-token 或在 .env 中配置 FEISHU_DEFAULT_FOLDER_TOKEN")
+        logger.error("错误: 目标为 folder 时必须指定 --folder-token 或在 .env 中配置 FEISHU_DEFAULT_FOLDER_TOKEN")
         sys.exit(1)
 
     if args.target == "wiki" and not args.wiki_token and not os.getenv("FEISHU_DEFAULT_WIKI_SPACE_ID") and not os.getenv("FEISHU_DEFAULT_WIKI_NODE_TOKEN"):
-        print("错误: 目标为 wiki 时必须指定 --wiki-token 或在 .env 中配置 FEISHU_DEFAULT_WIKI_SPACE_ID 或 FEISHU_DEFAULT_WIKI_NODE_TOKEN")
+        logger.error("错误: 目标为 wiki 时必须指定 --wiki-token 或在 .env 中配置 FEISHU_DEFAULT_WIKI_SPACE_ID 或 FEISHU_DEFAULT_WIKI_NODE_TOKEN")
         sys.exit(1)
 
     # 初始化
     try:
-        writer = FeishuWriter()
+        writer = FeishuWriter(cache_downloads=not args.no_cache_downloads)
     except Exception as e:
-        print(f"错误: {e}")
+        logger.error("错误: %s", e)
         sys.exit(1)
 
     # 获取文件列表
@@ -93,11 +97,11 @@ def main():
     elif path.is_dir():
         files = list(path.glob("**/*.md"))
     else:
-        print(f"错误: 路径不存在 - {args.path}")
+        logger.error("错误: 路径不存在 - %s", args.path)
         sys.exit(1)
 
     if not files:
-        print("未找到 MD 文件")
+        logger.info("未找到 MD 文件")
         sys.exit(0)
 
     # 处理文件
@@ -107,7 +111,7 @@ def main():
     duplicate_files = []
 
     for i, file in enumerate(files, 1):
-        print(f"正在处理 ({i}/{len(files)}): {file.name}")
+        logger.info("正在处理 (%s/%s): %s", i, len(files), file.name)
 
         try:
             result = writer.write_file(
@@ -125,11 +129,13 @@ def main():
                 doc_title = parts[2]
 
                 if args.on_duplicate == "ask":
-                    print(f"  发现同名文档: {doc_title}")
-                    print("  请选择处理方式:")
-                    print("  1. 覆盖更新")
-                    print("  2. 创建新文档")
-                    print("  3. 跳过")
+                    logger.info("  发现同名文档: %s", doc_title)
+                    logger.info("  请选择处理方式:")
+                    logger.info("  1. 覆盖更新")
+                    logger.info("  2. 创建新文档")
+                    logger.info("  3. 跳过")
+                    # 提示语输出完毕后再等待输入，避免与排队中的日志交错
+                    flush_logging()
                     choice = input("  请输入选项 (1/2/3): ").strip()
 
                     if choice == "1":
@@ -144,13 +150,13 @@ def main():
                             check_duplicate=False
                         )
                     else:
-                        print(f"  已跳过: {file.name}")
+                        logger.info("  已跳过: %s", file.name)
                         continue
                 elif args.on_duplicate == "update":
                     result = writer.update_document(existing_id, str(file))
                 elif args.on_duplicate == "new":
                     duplicate_files.append(doc_title)
-                    print(f"  发现同名文档「{doc_title}」，自动创建新文档")
+                    logger.info("  发现同名文档「%s」，自动创建新文档", doc_title)
                     result = writer.write_file(
                         str(file),
                         target=args.target,
@@ -159,36 +165,36 @@ def main():
                         check_duplicate=False
                     )
                 else:  # skip
-                    print(f"  已跳过: {file.name}")
+                    logger.info("  已跳过: %s", file.name)
                     continue
 
             if result.get("success"):
                 success_count += 1
                 total_images += result.get("uploaded_images", 0)
-                print(f"  [OK] {result.get('message')}")
+                logger.info("  [OK] %s", result.get('message'))
                 # 输出文档链接
                 doc_id = result.get("document_id")
                 node_token = result.get("node_token")
                 if node_token:
-                    print(f"  链接: https://feishu.cn/wiki/{node_token}")
+                    logger.info("  链接: https://feishu.cn/wiki/%s", node_token)
                 elif doc_id:
-                    print(f"  链接: https://feishu.cn/docx/{doc_id}")
+                    logger.info("  链接: https://feishu.cn/docx/%s", doc_id)
             else:
                 fail_count += 1
-                print(f"  [FAIL] {result.get('message')}")
+                logger.error("  [FAIL] %s", result.get('message'))
 
         except Exception as e:
             fail_count += 1
-            print(f"  [ERROR] 处理文件 {file.name} 时发生异常: {e}")
+            logger.error("  [ERROR] 处理文件 %s 时发生异常: %s", file.name, e)
 
     # 输出汇总
-    print("\n" + "=" * 40)
-    print(f"成功: {success_count} 个文档")
+    logger.info("\n%s", "=" * 40)
+    logger.info("成功: %s 个文档", success_count)
     if fail_count:
-        print(f"失败: {fail_count} 个文档")
+        logger.info("失败: %s 个文档", fail_count)
     if duplicate_files:
-        print(f"重复文件（已自动新建）: {', '.join(duplicate_files)}")
-    print(f"已上传图片: {total_images} 张")
+        logger.info("重复文件（已自动新建）: %s", ', '.join(duplicate_files))
+    logger.info("已上传图片: %s 张", total_images)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+日志模块
+"""
+
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# 所有模块共用的日志器
+logger = logging.getLogger("feishu")
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """
+    配置日志输出到 stdout（只输出消息本身）
+
+    日志记录先进入队列，由后台线程统一写出，上传线程不会阻塞在终端输出上。
+    重复调用无副作用。
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(level)
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+    # 退出前输出队列中剩余的日志
+    atexit.register(_listener.stop)
+
+
+def flush_logging() -> None:
+    """等待队列中的日志全部写出（如等待用户输入前）"""
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
@@ -6,8 +6,202 @@ Markdown 解析器模块
 
 import os
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, Generator, Iterator, List, Any, Optional, Tuple
+
+# 预编译正则，避免在逐行解析时重复查找/编译
+_RE_HEADING = re.compile(r"^(#+)")
+_RE_BULLET = re.compile(r"^[\-\*\+]\s")
+_RE_ORDERED = re.compile(r"^\d+\.\s")
+_RE_DIVIDER = re.compile(r"^[\-\*_]{3,}$")
+_RE_IMAGE = re.compile(r"!\[(.*?)\]\((.*?)\)")
+_RE_SEP_ROW = re.compile(r"^[\-:]+$")
+
+# 飞书 block_type
+_BT_TEXT = 2  # heading1-9 为 _BT_TEXT + level
+_BT_BULLET = 12
+_BT_ORDERED = 13
+_BT_CODE = 14
+_BT_QUOTE = 15
+_BT_DIVIDER = 22
+
+# 内联样式只读共享，避免每个文本片段都新建一个样式字典（序列化时会被复制）
+_STYLE_BOLD = {"bold": True}
+_STYLE_ITALIC = {"italic": True}
+_STYLE_INLINE_CODE = {"inline_code": True}
+
+# 飞书支持的代码语言映射（键均为小写）
+_LANGUAGE_MAP = {
+    "python": 49,
+    "javascript": 22,
+    "js": 22,
+    "typescript": 67,
+    "ts": 67,
+    "java": 21,
+    "go": 18,
+    "c": 7,
+    "cpp": 9,
+    "c++": 9,
+    "csharp": 10,
+    "c#": 10,
+    "ruby": 54,
+    "php": 46,
+    "swift": 64,
+    "kotlin": 27,
+    "rust": 55,
+    "sql": 61,
+    "shell": 58,
+    "bash": 58,
+    "json": 23,
+    "xml": 73,
+    "html": 20,
+    "css": 11,
+    "yaml": 74,
+    "markdown": 35,
+    "plain_text": 47,
+}
+
+# 内联格式的起始标记字符
+_INLINE_MARKERS = "*_`["
+# 超过该长度的文本不进入内联格式缓存
+_INLINE_CACHE_MAX_LEN = 256
+
+
+def _marker_positions(text: str) -> List[int]:
+    """按出现顺序返回所有内联标记字符的位置"""
+    positions = []
+    # 热点循环中把方法绑定到局部变量，省去每次迭代的属性查找
+    find = text.find
+    append = positions.append
+    for ch in _INLINE_MARKERS:
+        pos = find(ch)
+        while pos != -1:
+            append(pos)
+            pos = find(ch, pos + 1)
+    positions.sort()
+    return positions
+
+
+def _find_closing(text: str, marker: str, start: int, exhausted: set) -> int:
+    """
+    从内容起点 start 查找闭合标记
+
+    内容至少一个字符且不能跨行，返回闭合标记位置，找不到返回 -1。
+    exhausted 记录之后不再出现的标记，避免对同一标记反复扫描到末尾
+    """
+    if marker in exhausted:
+        return -1
+    end = text.find(marker, start + 1)
+    if end == -1:
+        exhausted.add(marker)
+        return -1
+    if text.find("\n", start, end) != -1:
+        return -1
+    return end
+
+
+def _match_inline(text: str, i: int, exhausted: set) -> Optional[Tuple[int, Dict]]:
+    """
+    尝试在位置 i 匹配一个内联格式
+
+    Returns:
+        (结束位置, 文本元素)，不匹配返回 None
+    """
+    ch = text[i]
+
+    # 行内代码
+    if ch == "`":
+        end = _find_closing(text, "`", i + 1, exhausted)
+        if end == -1:
+            return None
+        return end + 1, {
+            "text_run": {
+                "content": text[i + 1:end],
+                "text_element_style": _STYLE_INLINE_CODE
+            }
+        }
+
+    # 链接 [text](url)
+    if ch == "[":
+        mid = _find_closing(text, "](", i + 1, exhausted)
+        if mid == -1:
+            return None
+        end = _find_closing(text, ")", mid + 2, exhausted)
+        if end == -1:
+            return None
+        return end + 1, {
+            "text_run": {
+                "content": text[i + 1:mid],
+                "text_element_style": {
+                    "link": {"url": text[mid + 2:end]}
+                }
+            }
+        }
+
+    # 加粗 **text** / __text__
+    double = ch * 2
+    if text.startswith(double, i):
+        end = _find_closing(text, double, i + 2, exhausted)
+        if end != -1:
+            return end + 2, {
+                "text_run": {
+                    "content": text[i + 2:end],
+                    "text_element_style": _STYLE_BOLD
+                }
+            }
+
+    # 斜体 *text* / _text_
+    end = _find_closing(text, ch, i + 1, exhausted)
+    if end == -1:
+        return None
+    return end + 1, {
+        "text_run": {
+            "content": text[i + 1:end],
+            "text_element_style": _STYLE_ITALIC
+        }
+    }
+
+
+def _scan_inline_formats(text: str) -> List[Dict]:
+    """
+    解析内联格式（加粗、斜体、行内代码、链接）
+
+    按下标线性扫描，只在 * _ ` [ 处尝试匹配，闭合标记用 str.find 查找，
+    避免多分支非贪婪正则的回溯开销
+    """
+    elements = []
+    append = elements.append
+    plain_start = 0
+    exhausted = set()
+
+    for i in _marker_positions(text):
+        # 跳过已被上一个格式消耗的位置
+        if i < plain_start:
+            continue
+
+        match = _match_inline(text, i, exhausted)
+        if match is None:
+            continue
+
+        # 添加匹配前的普通文本
+        if i > plain_start:
+            append({"text_run": {"content": text[plain_start:i]}})
+
+        end, element = match
+        append(element)
+        plain_start = end
+
+    # 添加剩余文本
+    if plain_start < len(text):
+        elements.append({"text_run": {"content": text[plain_start:]}})
+
+    return elements if elements else [{"text_run": {"content": text}}]
+
+
+# 重复出现的短文本（列表项、标签等）只解析一次；结果在多个 block 间共享，
+# 下游只做序列化、不会修改，因此无需拷贝
+_parse_inline_formats_cached = lru_cache(maxsize=1024)(_scan_inline_formats)
 
 
 class MarkdownParser:
@@ -20,9 +214,10 @@ class MarkdownParser:
 
     def __init__(self, md_file_path: str):
         self.md_dir = Path(md_file_path).parent
-        # pending_images 格式: [(block_index, image_path, is_url), ...]
-        self.pending_images: List[Tuple[int, str, bool]] = []
-        self.pending_tables: List[Tuple[int, List[List[str]]]] = []  # [(block_index, table_data), ...]
+        # 直接记录占位符 block 本身，位置由调用方在解析完成后统一换算
+        # pending_images 格式: [(block, image_path, is_url), ...]
+        self.pending_images: List[Tuple[Dict, str, bool]] = []
+        self.pending_tables: List[Tuple[Dict, int, int, List[List[str]]]] = []  # [(block, rows, cols, table_data), ...]
 
     def parse(self, content: str) -> List[Dict[str, Any]]:
         """
@@ -32,111 +227,175 @@ class MarkdownParser:
         Returns:
             blocks 列表
         """
-        lines = content.split("\n")
-        blocks = []
-        i = 0
-
-        while i < len(lines):
-            line = lines[i]
-
-            # 标题块（所有 # 开头的都作为内容）
-            if line.startswith("#"):
-                level = len(re.match(r"^#+", line).group())
-                text = line[level:].strip()
-                blocks.append(self._create_heading_block(text, min(level, 9)))
-                i += 1
-                continue
-
-            # 代码块
-            if line.startswith("```"):
-                language = line[3:].strip() or "plain_text"
-                code_lines = []
-                i += 1
-                while i < len(lines) and not lines[i].startswith("```"):
-                    code_lines.append(lines[i])
-                    i += 1
-                i += 1  # 跳过结束的 ```
-                blocks.append(self._create_code_block("\n".join(code_lines), language))
-                continue
-
-            # 表格检测（以 | 开头的行）
-            if line.strip().startswith("|") and "|" in line[1:]:
-                table_data, consumed = self._parse_table(lines, i)
-                if table_data:
-                    block = self._create_table_block(table_data, len(blocks))
-                    blocks.append(block)
-                    i += consumed
-                    continue
-
-            # 图片
-            img_match = re.match(r"!\[(.*?)\]\((.*?)\)", line)
-            if img_match:
-                alt_text = img_match.group(1)
-                img_path = img_match.group(2)
-                block = self._create_image_block(img_path, alt_text, len(blocks))
-                if block:
-                    blocks.append(block)
-                i += 1
-                continue
+        return list(self.iter_blocks(content))
 
-            # 引用块
-            if line.startswith(">"):
-                quote_lines = []
-                while i < len(lines) and lines[i].startswith(">"):
-                    quote_lines.append(lines[i][1:].strip())
-                    i += 1
-                blocks.append(self._create_quote_block("\n".join(quote_lines)))
-                continue
-
-            # 无序列表
-            if re.match(r"^[\-\*\+]\s", line):
-                list_items = []
-                while i < len(lines) and re.match(r"^[\-\*\+]\s", lines[i]):
-                    list_items.append(re.sub(r"^[\-\*\+]\s", "", lines[i]))
-                    i += 1
-                for item in list_items:
-                    blocks.append(self._create_bullet_block(item))
-                continue
-
-            # 有序列表
-            if re.match(r"^\d+\.\s", line):
-                list_items = []
-                while i < len(lines) and re.match(r"^\d+\.\s", lines[i]):
-                    list_items.append(re.sub(r"^\d+\.\s", "", lines[i]))
-                    i += 1
-                for item in list_items:
-                    blocks.append(self._create_ordered_block(item))
-                continue
-
-            # 分割线
-            if re.match(r"^[\-\*\_]{3,}$", line.strip()):
-                blocks.append(self._create_divider_block())
-                i += 1
-                continue
+    def iter_blocks(self, content: str) -> Iterator[Dict[str, Any]]:
+        """
+        逐个产出 Block 的流式解析，调用方可以边解析边分批写入
 
-            # 普通段落
-            if line.strip():
-                blocks.append(self._create_text_block(line))
+        pending_images / pending_tables 随解析进度同步填充
+        """
+        # splitlines 同时处理 \n / \r\n / \r，行内不会残留 \r
+        return self._iter_blocks(content.splitlines())
 
+    def _iter_blocks(self, lines: List[str]) -> Iterator[Dict[str, Any]]:
+        """按行解析，逐个产出 block"""
+        n = len(lines)
+        i = 0
+        get_handler = self._FIRST_CHAR_HANDLERS.get
+        handle_text = self._handle_text
+
+        # 按行首字符直接分派到对应的处理函数；处理函数产出 block，并返回下一行的索引
+        while i < n:
+            handler = get_handler(lines[i][:1])
+            if handler:
+                i = yield from handler(self, lines, i, n)
+            else:
+                i = yield from handle_text(lines, i, n)
+
+    def _handle_heading(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """标题块（所有 # 开头的都作为内容）"""
+        line = lines[i]
+        level = _RE_HEADING.match(line).end()
+        text = line[level:].strip()
+        yield self._create_heading_block(text, min(level, 9))
+        return i + 1
+
+    def _handle_code_fence(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """代码块"""
+        line = lines[i]
+        if not line.startswith("```"):
+            return (yield from self._handle_plain(lines, i, n))
+
+        language = line[3:].strip() or "plain_text"
+        start = i + 1
+        # 只扫描下标定位结束的 ```，代码内容用切片一次性拼接，不逐行 append
+        end = start
+        while end < n and not lines[end].startswith("```"):
+            end += 1
+        yield self._create_code_block("\n".join(lines[start:end]), language)
+        return end + 1  # 跳过结束的 ```
+
+    def _handle_table(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """表格（以 | 开头的行），解析不出表格时按普通段落处理"""
+        if "|" in lines[i][1:]:
+            table_data, cols, consumed = self._parse_table(lines, i, n)
+            if table_data:
+                yield self._create_table_block(table_data, cols)
+                return i + consumed
+        return (yield from self._handle_plain(lines, i, n))
+
+    def _handle_image(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """图片"""
+        img_match = _RE_IMAGE.match(lines[i])
+        if not img_match:
+            return (yield from self._handle_plain(lines, i, n))
+
+        alt_text = img_match.group(1)
+        img_path = img_match.group(2)
+        block = self._create_image_block(img_path, alt_text)
+        if block:
+            yield block
+        return i + 1
+
+    def _handle_quote(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """引用块"""
+        quote_lines = []
+        while i < n and lines[i].startswith(">"):
+            quote_lines.append(lines[i][1:].strip())
             i += 1
+        yield self._create_quote_block("\n".join(quote_lines))
+        return i
 
-        return blocks
+    def _handle_list(self, lines: List[str], i: int, n: int, pattern: re.Pattern,
+                     create: Callable[[str], Dict], m: Optional[re.Match] = None) -> Generator[Dict, None, int]:
+        """
+        连续的列表项（无序/有序共用）
 
-    def _parse_table(self, lines: List[str], start_idx: int) -> Tuple[List[List[str]], int]:
+        Args:
+            pattern: 列表项前缀的正则
+            create: 由列表项正文创建块
+            m: 调用方已得到的首行匹配结果，避免重复匹配
+        """
+        match = pattern.match
+        if m is None:
+            m = match(lines[i])
+            if not m:
+                return (yield from self._handle_plain(lines, i, n))
+
+        # 扫描与建块合为一趟：复用匹配结果按 end() 切出正文，不再 sub 二次匹配
+        while m:
+            yield create(lines[i][m.end():])
+            i += 1
+            m = match(lines[i]) if i < n else None
+        return i
+
+    def _handle_bullet(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """无序列表"""
+        return (yield from self._handle_list(lines, i, n, _RE_BULLET, self._create_bullet_block))
+
+    def _handle_listish(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """- 或 * 开头：无序列表，否则尝试分割线"""
+        m = _RE_BULLET.match(lines[i])
+        if m:
+            return (yield from self._handle_list(lines, i, n, _RE_BULLET, self._create_bullet_block, m))
+        return (yield from self._handle_divider_or_text(lines, i, n))
+
+    def _handle_ordered(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """有序列表"""
+        return (yield from self._handle_list(lines, i, n, _RE_ORDERED, self._create_ordered_block))
+
+    def _handle_divider_or_text(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """分割线，否则按普通段落处理"""
+        if _RE_DIVIDER.match(lines[i].strip()):
+            yield self._create_divider_block()
+            return i + 1
+        return (yield from self._handle_plain(lines, i, n))
+
+    def _handle_text(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """其他行：缩进的表格或分割线，否则为普通段落"""
+        if lines[i].strip().startswith("|"):
+            return (yield from self._handle_table(lines, i, n))
+        return (yield from self._handle_divider_or_text(lines, i, n))
+
+    def _handle_plain(self, lines: List[str], i: int, n: int) -> Generator[Dict, None, int]:
+        """普通段落（空行跳过）"""
+        line = lines[i]
+        if line.strip():
+            yield self._create_text_block(line)
+        return i + 1
+
+    # 行首字符 -> 处理函数
+    _FIRST_CHAR_HANDLERS = {
+        "#": _handle_heading,
+        "`": _handle_code_fence,
+        "|": _handle_table,
+        "!": _handle_image,
+        ">": _handle_quote,
+        "-": _handle_listish,
+        "*": _handle_listish,
+        "+": _handle_bullet,
+        "_": _handle_divider_or_text,
+        **dict.fromkeys("0123456789", _handle_ordered),
+    }
+
+    def _parse_table(self, lines: List[str], start_idx: int, n: int) -> Tuple[List[List[str]], int, int]:
         """
         解析 Markdown 表格
 
         Args:
             lines: 所有行
             start_idx: 表格起始行索引
+            n: 总行数
 
         Returns:
-            (table_data, consumed_lines) - 表格数据和消耗的行数
+            (table_data, cols, consumed_lines) - 表格数据、列数（最宽行的单元格数）和消耗的行数
         """
         table_rows = []
+        cols = 0
         i = start_idx
 
-        while i < len(lines):
+        while i < n:
             line = lines[i].strip()
             # 检查是否是表格行
             if not line.startswith("|"):
@@ -148,20 +407,22 @@ class MarkdownParser:
                 break
 
             # 跳过分隔行（如 |---|---|---|）
-            if all(re.match(r"^[\-:]+$", cell.strip()) for cell in cells):
+            if all(_RE_SEP_ROW.match(cell.strip()) for cell in cells):
                 i += 1
                 continue
 
             table_rows.append(cells)
+            # 列数在逐行解析时顺带统计，写入时无需再遍历所有行
+            if len(cells) > cols:
+                cols = len(cells)
             i += 1
 
         consumed = i - start_idx
-        return table_rows, consumed
+        return table_rows, cols, consumed
 
     def _parse_table_row(self, line: str) -> List[str]:
-        """解析表格行，返回单元格列表"""
+        """解析表格行（调用方已去除首尾空白），返回单元格列表"""
         # 去掉首尾的 |
-        line = line.strip()
         if line.startswith("|"):
             line = line[1:]
         if line.endswith("|"):
@@ -171,100 +432,37 @@ class MarkdownParser:
         cells = [cell.strip() for cell in line.split("|")]
         return cells
 
-    def _create_table_block(self, table_data: List[List[str]], block_index: int) -> Dict:
-        """创建表格块占位符"""
-        # 记录待处理的表格
-        self.pending_tables.append((block_index, table_data))
-
+    def _create_table_block(self, table_data: List[List[str]], cols: int) -> Dict:
+        """创建表格块占位符（cols 为解析时统计的列数）"""
         rows = len(table_data)
-        cols = max(len(row) for row in table_data) if table_data else 0
 
-        return {
+        block = {
             "block_type": self.TABLE_PLACEHOLDER,
             "table_data": table_data,
             "rows": rows,
             "cols": cols
         }
 
+        # 记录待处理的表格
+        self.pending_tables.append((block, rows, cols, table_data))
+        return block
+
     def _create_text_elements(self, text: str) -> List[Dict]:
         """创建文本元素，处理内联格式"""
-        elements = []
-
-        # 简化处理：将整段作为一个文本元素
-        # 处理加粗、斜体、行内代码等
-        parts = self._parse_inline_formats(text)
-
-        for part in parts:
-            elements.append(part)
-
-        return elements if elements else [{"text_run": {"content": text}}]
+        # 处理加粗、斜体、行内代码等；结果已保证非空，无需再逐个拷贝
+        # 短文本走缓存，超长文本直接解析，避免缓存占用过多内存
+        if len(text) <= _INLINE_CACHE_MAX_LEN:
+            return _parse_inline_formats_cached(text)
+        return _scan_inline_formats(text)
 
     def _parse_inline_formats(self, text: str) -> List[Dict]:
-        """解析内联格式"""
-        elements = []
-
-        # 正则匹配各种格式
-        pattern = r"(\*\*(.+?)\*\*|__(.+?)__|`(.+?)`|\*(.+?)\*|_(.+?)_|\[(.+?)\]\((.+?)\))"
-
-        last_end = 0
-        for match in re.finditer(pattern, text):
-            # 添加匹配前的普通文本
-            if match.start() > last_end:
-                plain_text = text[last_end:match.start()]
-                if plain_text:
-                    elements.append({"text_run": {"content": plain_text}})
-
-            # 加粗
-            if match.group(2) or match.group(3):
-                content = match.group(2) or match.group(3)
-                elements.append({
-                    "text_run": {
-                        "content": content,
-                        "text_element_style": {"bold": True}
-                    }
-                })
-            # 行内代码
-            elif match.group(4):
-                elements.append({
-                    "text_run": {
-                        "content": match.group(4),
-                        "text_element_style": {"inline_code": True}
-                    }
-                })
-            # 斜体
-            elif match.group(5) or match.group(6):
-                content = match.group(5) or match.group(6)
-                elements.append({
-                    "text_run": {
-                        "content": content,
-                        "text_element_style": {"italic": True}
-                    }
-                })
-            # 链接
-            elif match.group(7) and match.group(8):
-                elements.append({
-                    "text_run": {
-                        "content": match.group(7),
-                        "text_element_style": {
-                            "link": {"url": match.group(8)}
-                        }
-                    }
-                })
-
-            last_end = match.end()
-
-        # 添加剩余文本
-        if last_end < len(text):
-            remaining = text[last_end:]
-            if remaining:
-                elements.append({"text_run": {"content": remaining}})
-
-        return elements if elements else [{"text_run": {"content": text}}]
+        """解析内联格式（加粗、斜体、行内代码、链接）"""
+        return _scan_inline_formats(text)
 
     def _create_heading_block(self, text: str, level: int) -> Dict:
         """创建标题块"""
         # block_type: heading1=3, heading2=4, ..., heading9=11
-        block_type_num = 2 + level
+        block_type_num = _BT_TEXT + level
         return {
             "block_type": block_type_num,
             f"heading{level}": {
@@ -275,7 +473,7 @@ class MarkdownParser:
     def _create_text_block(self, text: str) -> Dict:
         """创建文本块"""
         return {
-            "block_type": 2,
+            "block_type": _BT_TEXT,
             "text": {
                 "elements": self._create_text_elements(text)
             }
@@ -283,48 +481,17 @@ class MarkdownParser:
 
     def _create_code_block(self, code: str, language: str) -> Dict:
         """创建代码块"""
-        # 飞书支持的语言映射
-        language_map = {
-            "python": 49,
-            "javascript": 22,
-            "js": 22,
-            "typescript": 67,
-            "ts": 67,
-            "java": 21,
-            "go": 18,
-            "c": 7,
-            "cpp": 9,
-            "c++": 9,
-            "csharp": 10,
-            "c#": 10,
-            "ruby": 54,
-            "php": 46,
-            "swift": 64,
-            "kotlin": 27,
-            "rust": 55,
-            "sql": 61,
-            "shell": 58,
-            "bash": 58,
-            "json": 23,
-            "xml": 73,
-            "html": 20,
-            "css": 11,
-            "yaml": 74,
-            "markdown": 35,
-            "plain_text": 47,
-        }
-
-        lang_code = language_map.get(language.lower(), 47)  # 默认 plain_text
+        lang_code = _LANGUAGE_MAP.get(language.casefold(), 47)  # 默认 plain_text
 
         return {
-            "block_type": 14,
+            "block_type": _BT_CODE,
             "code": {
                 "elements": [{"text_run": {"content": code}}],
                 "language": lang_code
             }
         }
 
-    def _create_image_block(self, img_path: str, alt_text: str, block_index: int) -> Optional[Dict]:
+    def _create_image_block(self, img_path: str, alt_text: str) -> Optional[Dict]:
         """
         创建图片块占位符，记录待上传的图片
         支持本地路径和网络 URL
@@ -332,20 +499,21 @@ class MarkdownParser:
         # 判断是网络图片还是本地图片
         is_url = img_path.startswith(("http://", "https://"))
 
-        # 记录待上传的图片（保持原始路径，uploader 会自动处理）
-        self.pending_images.append((block_index, img_path, is_url))
-
-        # 返回占位符标记
-        return {
+        # 占位符标记
+        block = {
             "block_type": self.IMAGE_PLACEHOLDER,
             "image_path": img_path,
             "is_url": is_url
         }
 
+        # 记录待上传的图片（保持原始路径，uploader 会自动处理）
+        self.pending_images.append((block, img_path, is_url))
+        return block
+
     def _create_quote_block(self, text: str) -> Dict:
         """创建引用块"""
         return {
-            "block_type": 15,
+            "block_type": _BT_QUOTE,
             "quote": {
                 "elements": self._create_text_elements(text)
             }
@@ -354,7 +522,7 @@ class MarkdownParser:
     def _create_bullet_block(self, text: str) -> Dict:
         """创建无序列表块"""
         return {
-            "block_type": 12,
+            "block_type": _BT_BULLET,
             "bullet": {
                 "elements": self._create_text_elements(text)
             }
@@ -363,7 +531,7 @@ class MarkdownParser:
     def _create_ordered_block(self, text: str) -> Dict:
         """创建有序列表块"""
         return {
-            "block_type": 13,
+            "block_type": _BT_ORDERED,
             "ordered": {
                 "elements": self._create_text_elements(text)
             }
@@ -372,6 +540,6 @@ class MarkdownParser:
     def _create_divider_block(self) -> Dict:
         """创建分割线块"""
         return {
-            "block_type": 22,
+            "block_type": _BT_DIVIDER,
             "divider": {}
         }
@@ -6,32 +6,181 @@
 import hashlib
 import mimetypes
 import os
+import random
+import re
+import shutil
 import tempfile
+import time
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, BinaryIO, Callable, Dict, Optional, Set, Tuple, Union
 from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+# 可选依赖 requests_toolbelt：multipart 请求体边读文件边发送，未安装时由 requests 在内存中拼装
+try:
+    from requests_toolbelt import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
 
 from .auth import FeishuAuth
+from .log import logger
+
+# 常见图片扩展名 -> MIME 类型，避免逐张图片走 mimetypes 查表
+_EXT_MIME = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.bmp': 'image/bmp',
+    '.svg': 'image/svg+xml',
+}
+# 可直接从 URL 路径识别的图片扩展名
+_IMAGE_EXTS = frozenset(_EXT_MIME)
+# 微信公众号图片通过 wx_fmt 查询参数标明格式
+_WX_FMT_RE = re.compile(r'(?:^|&)wx_fmt=([^&]*)')
+_WX_FMT_EXT = {'jpeg': '.jpg', 'jpg': '.jpg', 'png': '.png',
+               'gif': '.gif', 'webp': '.webp', 'bmp': '.bmp'}
 
 
 class FeishuImageUploader:
     """飞书图片上传模块"""
 
     UPLOAD_URL = "https://open.feishu.cn/open-apis/drive/v1/medias/upload_all"
-    # 临时图片存储目录
-    TEMP_IMAGE_DIR = Path(tempfile.gettempdir()) / "feishu_images"
-
-    def __init__(self, auth: FeishuAuth, md_dir: Path = None):
+    # 网络图片下载缓存目录（放在用户目录，系统清理 /tmp 后仍可跨运行复用）
+    IMAGE_CACHE_DIR = Path.home() / ".cache" / "feishu_uploader" / "images"
+    REQUEST_TIMEOUT = 30  # 请求超时（秒）
+    POOL_CONNECTIONS = 32  # 缓存连接池的主机数（图片常来自多个 CDN）
+    POOL_MAXSIZE = 64  # 每个主机的最大连接数
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024  # 流式下载每次写入的字节数
+    MAX_DOWNLOAD_SIZE = 20 * 1024 * 1024  # 飞书图片上传上限 20MB
+    UPLOAD_RETRIES = 3  # 上传的最大尝试次数（multipart POST 不在传输层重试）
+    RETRY_STATUS = frozenset((429, 500, 502, 503, 504))  # 可重试的 HTTP 状态码
+    CACHE_DIR_MAX_BYTES = 512 * 1024 * 1024  # 图片缓存目录的容量上限，超出时淘汰最久未用的图片
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+    def __init__(self, auth: FeishuAuth, md_dir: Path = None, session: requests.Session = None,
+                 cache_downloads: bool = True, cache_dir_max_bytes: int = None):
+        """
+        Args:
+            auth: 飞书认证
+            md_dir: Markdown 文件所在目录（解析相对图片路径）
+            session: 下载/上传共用的 Session，默认新建
+            cache_downloads: 是否把网络图片保存到缓存目录；为 False 时下载到内存直接上传，不落盘
+            cache_dir_max_bytes: 图片缓存目录容量上限（字节），默认 CACHE_DIR_MAX_BYTES
+        """
         self.auth = auth
         self.md_dir = md_dir or Path.cwd()
-        # 确保临时目录存在
-        self.TEMP_IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+        self.cache_downloads = cache_downloads
+        # 下载与上传共用一个 Session，同一主机的请求复用 keep-alive 连接
+        self.session = session or self._create_session()
+        # 确保缓存目录存在（用户目录不可写时退回系统临时目录），并把已有图片控制在容量上限内
+        try:
+            self.IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            self.IMAGE_CACHE_DIR = Path(tempfile.gettempdir()) / "feishu_images"
+            self.IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # 缓存目录中已有的图片文件名：扫描一次目录即可判断 URL 是否已下载，不必逐个 stat
+        self._cached_names = self._evict_cached_images(
+            self.CACHE_DIR_MAX_BYTES if cache_dir_max_bytes is None else cache_dir_max_bytes
+        )
+        # 本地图片路径是否存在的缓存（同一文档中同一图片常被多次引用）
+        self._exists_cache: Dict[str, bool] = {}
+
+    def _evict_cached_images(self, max_bytes: int) -> Set[str]:
+        """
+        按最近使用时间淘汰缓存目录中的旧图片，直到总大小不超过 max_bytes
+
+        Returns:
+            淘汰后仍保留的图片文件名
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.IMAGE_CACHE_DIR) as it:
+            for entry in it:
+                # 只管理下载的图片，正在写入的 .part 文件不动
+                if not entry.name.startswith("img_") or not entry.is_file():
+                    continue
+                st = entry.stat()
+                entries.append((max(st.st_atime, st.st_mtime), st.st_size, entry.name))
+                total += st.st_size
+
+        kept = {name for _, _, name in entries}
+        if total <= max_bytes:
+            return kept
+
+        entries.sort()
+        for _, size, name in entries:
+            try:
+                os.unlink(self.IMAGE_CACHE_DIR / name)
+            except OSError:
+                continue
+            kept.discard(name)
+            total -= size
+            if total <= max_bytes:
+                break
+        return kept
+
+    def _exists(self, path: Path) -> bool:
+        """判断本地文件是否存在，结果按路径缓存"""
+        key = str(path)
+        exists = self._exists_cache.get(key)
+        if exists is None:
+            exists = self._exists_cache[key] = path.exists()
+        return exists
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        """命中缓存时刷新访问时间（不依赖文件系统的 atime 设置），供 LRU 淘汰参考"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _create_session(self) -> requests.Session:
+        """创建复用连接的 Session（keep-alive + 连接池 + 传输层重试）"""
+        # 只重试幂等请求：上传为 multipart POST，文件流发送后无法原样重放，由 _with_retry 重新发送
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            raise_on_status=False  # 重试耗尽后仍返回响应，由调用方 raise_for_status
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_CONNECTIONS,
+            pool_maxsize=self.POOL_MAXSIZE,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["User-Agent"] = self.USER_AGENT
+        return session
+
+    @staticmethod
+    def _url_filename(url: str) -> str:
+        """根据 URL 生成唯一文件名（URL 的 hash 值 + 扩展名）"""
+        # 解析 URL 获取文件扩展名
+        parsed_url = urlparse(url)
+        url_path = parsed_url.path
+
+        # 从 URL 或参数中提取扩展名
+        ext = os.path.splitext(url_path)[1]
+        if ext.lower() not in _IMAGE_EXTS:
+            # 尝试从 URL 参数中获取（微信公众号图片格式），默认 .jpg
+            m = _WX_FMT_RE.search(parsed_url.query)
+            ext = _WX_FMT_EXT.get(m.group(1), '.jpg') if m else '.jpg'
+
+        # URL 的 hash 值仅用于区分文件，无需加密强度
+        url_hash = hashlib.blake2b(url.encode('utf-8'), digest_size=6).hexdigest()
+        return f"img_{url_hash}{ext}"
 
     def download_from_url(self, url: str) -> Optional[Path]:
         """
-        从 URL 下载图片到本地临时目录
+        从 URL 下载图片到本地缓存目录
 
         Args:
             url: 图片 URL
@@ -40,48 +189,82 @@ class FeishuImageUploader:
             本地图片路径 或 None（失败时）
         """
         try:
-            # 解析 URL 获取文件扩展名
-            parsed_url = urlparse(url)
-            url_path = parsed_url.path
-
-            # 从 URL 或参数中提取扩展名
-            ext = os.path.splitext(url_path)[1]
-            if not ext or ext.lower() not in {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.svg'}:
-                # 尝试从 URL 参数中获取（微信公众号图片格式）
-                if 'wx_fmt=' in url:
-                    fmt = url.split('wx_fmt=')[-1].split('&')[0]
-                    ext_map = {'jpeg': '.jpg', 'jpg': '.jpg', 'png': '.png',
-                               'gif': '.gif', 'webp': '.webp', 'bmp': '.bmp'}
-                    ext = ext_map.get(fmt, '.jpg')
-                else:
-                    ext = '.jpg'  # 默认
-
-            # 生成唯一文件名（URL 的 hash 值）
-            url_hash = hashlib.md5(url.encode('utf-8')).hexdigest()[:12]
-            filename = f"img_{url_hash}{ext}"
-            local_path = self.TEMP_IMAGE_DIR / filename
-
-            # 如果已存在，直接返回
-            if local_path.exists():
+            filename = self._url_filename(url)
+            local_path = self.IMAGE_CACHE_DIR / filename
+
+            # 此前已下载（文件按 URL 命名，下载经原子替换写入，存在即完整），
+            # 查内存中的文件名集合，不逐个 stat
+            if filename in self._cached_names:
+                self._touch(local_path)
                 return local_path
 
-            # 下载图片
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-            resp = requests.get(url, headers=headers, timeout=30)
-            resp.raise_for_status()
+            # 流式下载：按块从 socket 直接写入磁盘，不在内存中缓冲整张图片
+            with self.session.get(url, timeout=self.REQUEST_TIMEOUT, stream=True) as resp:
+                resp.raise_for_status()
 
-            # 保存到本地
-            with open(local_path, 'wb') as f:
-                f.write(resp.content)
+                # 超过上传上限的图片无需下载
+                content_length = resp.headers.get("Content-Length")
+                if content_length and int(content_length) > self.MAX_DOWNLOAD_SIZE:
+                    logger.warning("警告: 图片过大（%s 字节），跳过下载 - %s", int(content_length), url)
+                    return None
+
+                # 先写入临时文件再原子替换，并发下载同一 URL 时不会读到半个文件
+                fd, part_path = tempfile.mkstemp(dir=self.IMAGE_CACHE_DIR, suffix=".part")
+                try:
+                    resp.raw.decode_content = True  # 解开 gzip 等传输编码
+                    with os.fdopen(fd, 'wb') as f:
+                        shutil.copyfileobj(resp.raw, f, self.DOWNLOAD_CHUNK_SIZE)
+                    os.replace(part_path, local_path)
+                    self._cached_names.add(filename)
+                except BaseException:
+                    os.unlink(part_path)
+                    raise
 
             return local_path
 
         except Exception as e:
-            print(f"警告: 图片下载失败 - {url}: {e}")
+            logger.warning("警告: 图片下载失败 - %s: %s", url, e)
+            return None
+
+    def download_bytes(self, url: str) -> Optional[Tuple[str, bytes]]:
+        """
+        下载图片到内存（不写临时文件）
+
+        Args:
+            url: 图片 URL
+
+        Returns:
+            (文件名, 图片内容) 或 None（失败时）
+        """
+        try:
+            with self.session.get(url, timeout=self.REQUEST_TIMEOUT, stream=True) as resp:
+                resp.raise_for_status()
+                # 多读 1 字节即可判断是否超过上传上限，无需依赖 Content-Length
+                data = resp.raw.read(self.MAX_DOWNLOAD_SIZE + 1, decode_content=True)
+
+            if len(data) > self.MAX_DOWNLOAD_SIZE:
+                logger.warning("警告: 图片过大（超过 %s 字节），跳过下载 - %s", self.MAX_DOWNLOAD_SIZE, url)
+                return None
+            return self._url_filename(url), data
+        except Exception as e:
+            logger.warning("警告: 图片下载失败 - %s: %s", url, e)
             return None
 
+    def load_image(self, image_source: str) -> Optional[Union[Path, Tuple[str, bytes]]]:
+        """
+        加载待上传的图片
+
+        Args:
+            image_source: 图片路径（本地相对/绝对路径 或 URL）
+
+        Returns:
+            本地图片路径；不缓存下载时网络图片返回 (文件名, 图片内容)；失败返回 None
+        """
+        if not self.cache_downloads and image_source.startswith(("http://", "https://")):
+            logger.info("正在下载网络图片: %s...", image_source[:60])
+            return self.download_bytes(image_source)
+        return self.resolve_image_path(image_source)
+
     def resolve_image_path(self, img_path: str) -> Optional[Path]:
         """
         解析图片路径，支持本地路径和网络 URL
@@ -94,7 +277,7 @@ class FeishuImageUploader:
         """
         # 网络图片
         if img_path.startswith(("http://", "https://")):
-            print(f"正在下载网络图片: {img_path[:60]}...")
+            logger.info("正在下载网络图片: %s...", img_path[:60])
             return self.download_from_url(img_path)
 
         # 本地图片
@@ -102,62 +285,177 @@ class FeishuImageUploader:
         if not path.is_absolute():
             path = self.md_dir / img_path
 
-        if path.exists():
+        if self._exists(path):
             return path
 
-        print(f"警告: 图片不存在 - {path}")
+        logger.warning("警告: 图片不存在 - %s", path)
         return None
 
-    def upload(self, image_source: str, parent_node: str) -> Optional[str]:
+    def upload(self, image_source: str, parent_node: str,
+               headers: Optional[Dict[str, str]] = None) -> Optional[str]:
         """
         上传图片到飞书（支持本地路径和网络 URL）
 
         Args:
             image_source: 图片路径（本地相对/绝对路径 或 URL）
             parent_node: 图片块的 block_id（必需）
+            headers: 预先构建的鉴权请求头（可选，批量上传时由调用方统一获取 token），仅用于首次尝试
 
         Returns:
             file_token 或 None（失败时）
         """
         if not parent_node:
-            print("警告: 缺少 parent_node 参数")
+            logger.warning("警告: 缺少 parent_node 参数")
             return None
 
         # 解析图片路径（支持本地和网络）
-        path = self.resolve_image_path(image_source)
-        if not path:
+        image = self.load_image(image_source)
+        if not image:
+            return None
+        return self.upload_image(image, parent_node, source=image_source, headers=headers)
+
+    def upload_image(self, image: Union[Path, Tuple[str, bytes]], parent_node: str, source: str = None,
+                     headers: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """
+        上传已加载的图片（load_image 的返回值）
+
+        Args:
+            image: 本地图片路径 或 (文件名, 图片内容)
+            parent_node: 图片块的 block_id
+            source: 原始图片路径，仅用于日志
+            headers: 预先构建的鉴权请求头（可选，批量上传时由调用方统一获取 token），仅用于首次尝试
+
+        Returns:
+            file_token 或 None（失败时）
+        """
+        if isinstance(image, Path):
+            return self._upload_file(image, parent_node, source or str(image), headers)
+        name, data = image
+        return self.upload_bytes(name, data, parent_node, source=source, headers=headers)
+
+    def upload_bytes(self, name: str, data: bytes, parent_node: str, source: str = None,
+                     headers: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """
+        上传内存中的图片内容，不经过磁盘
+
+        Args:
+            name: 文件名（用于推断 MIME 类型）
+            data: 图片内容
+            parent_node: 图片块的 block_id
+            source: 原始图片路径，仅用于日志
+            headers: 预先构建的鉴权请求头（可选，批量上传时由调用方统一获取 token），仅用于首次尝试
+
+        Returns:
+            file_token 或 None（失败时）
+        """
+        return self._post_media(name, data, len(data), parent_node, source or name, headers)
+
+    def _upload_file(self, path: Path, parent_node: str, source: str,
+                     headers: Optional[Dict[str, str]], reload: bool = True) -> Optional[str]:
+        """上传本地图片文件"""
+        try:
+            f = open(path, "rb")
+        except OSError as e:
+            # 文件在解析后被删除（如缓存图片被其他进程淘汰、被手动清理），存在性缓存已过期
+            self._forget(path)
+            if reload and source.startswith(("http://", "https://")):
+                image = self.load_image(source)
+                if isinstance(image, Path):
+                    return self._upload_file(image, parent_node, source, headers, reload=False)
+                if image:
+                    return self.upload_image(image, parent_node, source=source, headers=headers)
+                return None
+            logger.warning("警告: 图片读取失败 - %s: %s", source, e)
             return None
 
-        # 获取 MIME 类型
-        mime_type, _ = mimetypes.guess_type(str(path))
+        # 只打开一次文件：fstat 取大小，同一句柄作为请求体流式发送。
+        # 请求体不改用 mmap/sendfile：requests 无法走 sendfile；MultipartEncoder 按 len() 判断剩余字节，
+        # mmap 的长度不随读取减少会导致死循环。文件句柄本身已由 MultipartEncoder 分块读取，不整体读入内存
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            return self._post_media(path.name, f, size, parent_node, source, headers)
+
+    def _forget(self, path: Path) -> None:
+        """移除文件已不存在的缓存记录，下次使用时重新检查/下载"""
+        self._exists_cache.pop(str(path), None)
+        if path.parent == self.IMAGE_CACHE_DIR:
+            self._cached_names.discard(path.name)
+
+    def auth_headers(self) -> Dict[str, str]:
+        """构建上传接口的鉴权请求头"""
+        return {"Authorization": f"Bearer {self.auth.get_token()}"}
+
+    def _post_media(self, name: str, payload: Union[bytes, BinaryIO], size: int, parent_node: str,
+                    source: str, headers: Optional[Dict[str, str]]) -> Optional[str]:
+        """发送 multipart 上传请求（失败时重试）"""
+        # 获取 MIME 类型（常见图片格式直接查表，其他格式再交给 mimetypes）
+        mime_type = _EXT_MIME.get(os.path.splitext(name)[1].lower())
         if not mime_type:
-            mime_type = "application/octet-stream"
+            mime_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
 
-        headers = {
-            "Authorization": f"Bearer {self.auth.get_token()}"
-        }
+        # 首次尝试使用调用方预取的请求头，重试时重新获取，避免 token 恰好过期
+        attempt_headers = iter((headers,))
+        try:
+            result = self._with_retry(
+                lambda: self._send_media(name, payload, size, parent_node, mime_type, next(attempt_headers, None))
+            )
+            if result.get("code") != 0:
+                logger.warning("警告: 图片上传失败 - %s: %s", source, result.get('msg'))
+                return None
 
-        with open(path, "rb") as f:
+            return result.get("data", {}).get("file_token")
+        except Exception as e:
+            logger.warning("警告: 图片上传异常 - %s: %s", source, e)
+            return None
+
+    def _send_media(self, name: str, payload: Union[bytes, BinaryIO], size: int, parent_node: str,
+                    mime_type: str, headers: Optional[Dict[str, str]]) -> Dict[str, Any]:
+        """发送一次 multipart 上传请求，返回接口响应"""
+        # 复制一份：调用方的请求头会在多个上传线程间共享，下面还要追加 Content-Type
+        headers = dict(headers) if headers else self.auth_headers()
+        data = {
+            "file_name": name,
+            "parent_type": "docx_image",
+            "parent_node": parent_node,
+            "size": str(size)
+        }
+        # 重试时从头重新发送文件内容
+        if not isinstance(payload, bytes):
+            payload.seek(0)
+
+        if MultipartEncoder is not None:
+            # 流式编码：请求体按块从文件读取发送，不在内存中拼出完整的 multipart 内容
+            body = MultipartEncoder(fields=[*data.items(), ("file", (name, payload, mime_type))])
+            headers["Content-Type"] = body.content_type
+            resp = self.session.post(self.UPLOAD_URL, headers=headers, data=body,
+                                     timeout=self.REQUEST_TIMEOUT)
+        else:
             files = {
-                "file": (path.name, f, mime_type)
-            }
-            data = {
-                "file_name": path.name,
-                "parent_type": "docx_image",
-                "parent_node": parent_node,
-                "size": str(path.stat().st_size)
+                "file": (name, payload, mime_type)
             }
+            resp = self.session.post(self.UPLOAD_URL, headers=headers, files=files, data=data,
+                                     timeout=self.REQUEST_TIMEOUT)
+        resp.raise_for_status()
+        return resp.json()
 
-            try:
-                resp = requests.post(self.UPLOAD_URL, headers=headers, files=files, data=data, timeout=30)
-                resp.raise_for_status()
-                result = resp.json()
-
-                if result.get("code") != 0:
-                    print(f"警告: 图片上传失败 - {image_source}: {result.get('msg')}")
-                    return None
+    def _with_retry(self, func: Callable[..., Dict[str, Any]], *args, **kwargs) -> Dict[str, Any]:
+        """
+        调用 func 发送请求，遇到连接错误、超时、429/5xx 或接口返回 code != 0 时
+        按 2^n 秒加随机抖动退避后重试，最多 UPLOAD_RETRIES 次
 
-                return result.get("data", {}).get("file_token")
-            except Exception as e:
-                print(f"警告: 图片上传异常 - {image_source}: {e}")
-                return None
+        Returns:
+            最后一次的接口响应；最后一次仍抛出异常时向上抛出
+        """
+        for attempt in range(self.UPLOAD_RETRIES):
+            last = attempt == self.UPLOAD_RETRIES - 1
+            try:
+                result = func(*args, **kwargs)
+                if result.get("code") == 0 or last:
+                    return result
+            except (requests.ConnectionError, requests.Timeout):
+                if last:
+                    raise
+            except requests.HTTPError as e:
+                if last or e.response is None or e.response.status_code not in self.RETRY_STATUS:
+                    raise
+            time.sleep(2 ** attempt + random.random())
@@ -4,8 +4,10 @@
 """
 
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
 from dotenv import load_dotenv
 
@@ -13,12 +15,31 @@ from .auth import FeishuAuth
 from .uploader import FeishuImageUploader
 from .parser import MarkdownParser
 from .doc_writer import FeishuDocWriter
+from .log import logger
+
+
+@lru_cache(maxsize=32)
+def _parse_cached(path_str: str, mtime_ns: int, size: int) -> Tuple[List[Dict], List, List]:
+    """
+    按 (路径, 修改时间, 大小) 缓存解析结果，文件改动后键随之变化、自动重新解析
+
+    结果在多次写入间共享，下游只读取、不修改
+    """
+    parser = MarkdownParser(path_str)
+    blocks = parser.parse(Path(path_str).read_text(encoding="utf-8"))
+    return blocks, parser.pending_images, parser.pending_tables
 
 
 class FeishuWriter:
     """飞书写入主类"""
 
-    def __init__(self):
+    IMAGE_UPLOAD_WORKERS = 8  # 图片并发上传线程数
+
+    def __init__(self, cache_downloads: bool = True):
+        """
+        Args:
+            cache_downloads: 是否把网络图片保存到缓存目录；为 False 时下载到内存直接上传，不落盘
+        """
         load_dotenv()
 
         app_id = os.getenv("FEISHU_APP_ID")
@@ -30,7 +51,10 @@ class FeishuWriter:
         self.auth = FeishuAuth(app_id, app_secret)
         # uploader 会在写入时初始化，因为需要知道 md_file_path
         self.uploader = None
+        self.cache_downloads = cache_downloads
         self.doc_writer = FeishuDocWriter(self.auth)
+        # 获取 token 与文档 API 同在 open.feishu.cn，共用连接池：首个文档请求直接复用获取 token 时建立的 TLS 连接
+        self.auth.session = self.doc_writer.session
 
     def write_file(
         self,
@@ -57,16 +81,11 @@ class FeishuWriter:
         if not path.exists():
             return {"success": False, "document_id": None, "message": f"文件不存在: {md_path}"}
 
-        # 读取 MD 文件
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
-
         # 用文件名作为标题（去掉 .md 扩展名）
         title = path.stem
 
-        # 解析 MD 内容（不再传入 uploader）
-        parser = MarkdownParser(str(path))
-        blocks = parser.parse(content)
+        # 读取并解析 MD 内容
+        blocks, pending_images, pending_tables = self._load_and_parse(path)
 
         # folder_token 回退到环境变量
         if target == "folder" and not folder_token:
@@ -109,7 +128,7 @@ class FeishuWriter:
                 return {"success": False, "document_id": None, "message": f"创建知识库文档失败: {e}"}
 
             # 写入内容（包含图片和表格处理）
-            uploaded_images, write_success = self._write_content_with_images(str(path), doc_id, blocks, parser.pending_images, parser.pending_tables)
+            uploaded_images, write_success = self._write_content_with_images(str(path), doc_id, blocks, pending_images, pending_tables)
 
             return {
                 "success": write_success,
@@ -129,7 +148,7 @@ class FeishuWriter:
                 return {"success": False, "document_id": None, "message": f"创建文档失败: {e}"}
 
             # 写入内容（包含图片和表格处理）
-            uploaded_images, write_success = self._write_content_with_images(str(path), doc_id, blocks, parser.pending_images, parser.pending_tables)
+            uploaded_images, write_success = self._write_content_with_images(str(path), doc_id, blocks, pending_images, pending_tables)
 
             return {
                 "success": write_success,
@@ -138,6 +157,17 @@ class FeishuWriter:
                 "uploaded_images": uploaded_images
             }
 
+    @staticmethod
+    def _load_and_parse(path: Path) -> Tuple[List[Dict], List, List]:
+        """
+        读取并解析 MD 文件，同一文件未改动时复用上次的解析结果
+
+        Returns:
+            (blocks, pending_images, pending_tables)
+        """
+        stat = path.stat()
+        return _parse_cached(str(path), stat.st_mtime_ns, stat.st_size)
+
     def _write_content_with_images(self, md_path: str, doc_id: str, blocks: List[Dict], pending_images: List, pending_tables: List) -> tuple:
         """
         写入内容，包含图片和表格处理，保持原始顺序
@@ -146,113 +176,149 @@ class FeishuWriter:
             md_path: Markdown 文件路径（用于解析相对图片路径）
             doc_id: 文档 ID
             blocks: 所有 blocks
-            pending_images: 待上传的图片列表 [(block_index, image_path, is_url), ...]
-            pending_tables: 待处理的表格列表 [(block_index, table_data), ...]
+            pending_images: 待上传的图片列表 [(block, image_path, is_url), ...]
+            pending_tables: 待处理的表格列表 [(block, rows, cols, table_data), ...]
 
         Returns:
             (成功上传的图片数量, 是否全部写入成功)
         """
         uploaded_count = 0
         all_success = True
+        # 已上传待回填 token 的图片：[(图片块 ID, file_token, 图片路径), ...]
+        uploaded_images = []
 
         # 初始化 uploader（传入 md_path 用于处理相对路径）
         if not self.uploader:
             from pathlib import Path
-            self.uploader = FeishuImageUploader(self.auth, Path(md_path).parent)
+            self.uploader = FeishuImageUploader(self.auth, Path(md_path).parent,
+                                                cache_downloads=self.cache_downloads)
         else:
             from pathlib import Path
             self.uploader.md_dir = Path(md_path).parent
 
-        # 构建图片索引映射（新的三元组格式）
-        image_map = {idx: (path, is_url) for idx, path, is_url in pending_images}
+        # 占位符 block 按对象身份换算为在 blocks 中的位置
+        id_to_idx = {id(b): i for i, b in enumerate(blocks)}
+        # 构建图片索引映射
+        image_map = {id_to_idx[id(b)]: (path, is_url) for b, path, is_url in pending_images}
         # 构建表格索引映射
-        table_map = {idx: data for idx, data in pending_tables}
-
-        # 按顺序处理每个 block
-        # 为了保持顺序，需要分批写入：遇到图片或表格时先写入之前的普通块，再处理特殊块
-        current_batch = []
-
+        table_map = {id_to_idx[id(b)]: (rows, cols, data) for b, rows, cols, data in pending_tables}
+
+        # 第一遍：整篇文档的布局（普通块 + 空图片块 + 空表格块）按原始顺序分批一次写入，
+        # 不再为每张图片、每个表格单独发请求
+        layout = []
+        # 特殊块在 layout 中的位置：[(位置, 图片路径), ...]、[(位置, 列数, 表格数据), ...]
+        image_slots = []
+        table_slots = []
         for i, block in enumerate(blocks):
             if i in image_map:
-                # 遇到图片，先写入之前积累的普通块
-                if current_batch:
-                    if not self.doc_writer.append_blocks(doc_id, doc_id, current_batch):
-                        all_success = False
-                    current_batch = []
-
-                # 处理图片
-                image_path, is_url = image_map[i]
-
-                # 1. 创建图片块占位符
-                image_block_id = self.doc_writer.create_image_block(doc_id, doc_id)
-                if not image_block_id:
-                    print(f"警告: 创建图片块失败 - {image_path}")
-                    continue
-
-                # 2. 上传图片（uploader 会自动处理本地/网络图片）
-                file_token = self.uploader.upload(image_path, image_block_id)
-                if not file_token:
-                    print(f"警告: 图片上传失败 - {image_path}")
-                    continue
-
-                # 3. 更新图片块的 token
-                if self.doc_writer.replace_image_token(doc_id, image_block_id, file_token):
-                    uploaded_count += 1
-                    print(f"  [图片] 上传成功: {image_path[:60]}{'...' if len(image_path) > 60 else ''}")
-                else:
-                    print(f"警告: 更新图片块失败 - {image_path}")
-
+                image_slots.append((len(layout), image_map[i][0]))
+                layout.append(self.doc_writer.image_block())
             elif i in table_map:
-                # 遇到表格，先写入之前积累的普通块
-                if current_batch:
-                    if not self.doc_writer.append_blocks(doc_id, doc_id, current_batch):
-                        all_success = False
-                    current_batch = []
-
-                # 处理表格
-                table_data = table_map[i]
-                rows = len(table_data)
-                cols = max(len(row) for row in table_data) if table_data else 0
-
+                # 行列数在解析时已算好
+                rows, cols, table_data = table_map[i]
                 if rows > 0 and cols > 0:
-                    # 1. 创建表格
-                    table_block_id = self.doc_writer.create_table(doc_id, doc_id, rows, cols)
-                    if table_block_id:
-                        # 2. 填充表格内容
-                        self.doc_writer.fill_table(doc_id, table_block_id, table_data)
-                    else:
-                        print(f"警告: 创建表格失败")
+                    table_slots.append((len(layout), cols, table_data))
+                    layout.append(self.doc_writer.table_block(rows, cols))
             else:
-                # 普通块，加入当前批次
-                current_batch.append(block)
-
-        # 写入剩余的普通块
-        if current_batch:
-            if not self.doc_writer.append_blocks(doc_id, doc_id, current_batch):
+                layout.append(block)
+
+        image_at = dict(image_slots)
+        table_at = {pos: (cols, table_data) for pos, cols, table_data in table_slots}
+        # 已提交的图片上传任务：[(图片块 ID, 图片路径, future), ...]
+        upload_futures = []
+
+        with ThreadPoolExecutor(max_workers=self.IMAGE_UPLOAD_WORKERS) as pool:
+            # 写入布局之前就开始并行下载/解析所有图片（同一图片只加载一次），
+            # 下载延迟与布局写入重叠；加载任务先于所有上传任务入队，上传等待加载时不会占满线程池
+            loads = {image_path: pool.submit(self.uploader.load_image, image_path)
+                     for image_path in dict.fromkeys(image_at.values())}
+            # 整篇文档的上传共用一次获取的鉴权请求头，不必每张图片都取 token
+            auth_headers = self.uploader.auth_headers() if image_at else None
+            def on_batch(offset: int, children: List[Dict]) -> None:
+                # 每批块创建成功后立即处理其中的图片和表格，与后续批次的写入并行
+                for pos, child in enumerate(children, offset):
+                    if pos in image_at:
+                        image_block_id = child.get("block_id")
+                        image_path = image_at[pos]
+                        # 上传的素材绑定到所属图片块，每个图片块各自上传（同一图片只加载一次）
+                        future = pool.submit(self._upload_image, image_path, loads[image_path], image_block_id,
+                                             auth_headers)
+                        upload_futures.append((image_block_id, image_path, future))
+                    elif pos in table_at:
+                        cols, table_data = table_at[pos]
+                        self.doc_writer.fill_table(doc_id, child.get("block_id"), table_data, cols)
+
+            # 返回按顺序创建出的块；写入中途失败时只包含已成功的部分
+            created = self.doc_writer.create_children(doc_id, doc_id, layout, on_batch=on_batch)
+            if len(created) < len(layout):
                 all_success = False
+                for pos, image_path in image_slots:
+                    if pos >= len(created):
+                        logger.warning("警告: 创建图片块失败 - %s", image_path)
+                for pos, _, _ in table_slots:
+                    if pos >= len(created):
+                        logger.warning("警告: 创建表格失败")
+
+            # 按原始顺序等待上传结果
+            for image_block_id, image_path, future in upload_futures:
+                file_token = future.result()
+                if file_token:
+                    uploaded_images.append((image_block_id, file_token, image_path))
+                else:
+                    logger.warning("警告: 图片上传失败 - %s", image_path)
+
+        # 一次 batch_update 回填所有图片 token，失败时退回逐个更新
+        if uploaded_images:
+            if self.doc_writer.replace_image_tokens(doc_id, {bid: token for bid, token, _ in uploaded_images}):
+                replaced = uploaded_images
+            else:
+                replaced = []
+                for image_block_id, file_token, image_path in uploaded_images:
+                    if not self.doc_writer.replace_image_token(doc_id, image_block_id, file_token):
+                        logger.warning("警告: 更新图片块失败 - %s", image_path)
+                        continue
+                    replaced.append((image_block_id, file_token, image_path))
+
+            for _, _, image_path in replaced:
+                logger.info("  [图片] 上传成功: %s%s", image_path[:60], '...' if len(image_path) > 60 else '')
+            uploaded_count += len(replaced)
 
         return uploaded_count, all_success
 
+    def _upload_image(self, image_path: str, loaded: Future, image_block_id: str,
+                      auth_headers: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """
+        上传单张已加载的图片（在线程池中执行，失败重试由 uploader 负责）
+
+        Args:
+            image_path: 图片路径（本地路径 或 URL），用于日志
+            loaded: uploader.load_image 的 future（本地路径 或 内存中的图片内容）
+            image_block_id: 图片块 ID
+            auth_headers: 预先获取的鉴权请求头
+
+        Returns:
+            file_token 或 None（失败时）
+        """
+        image = loaded.result()
+        if not image:
+            return None
+        return self.uploader.upload_image(image, image_block_id, source=image_path, headers=auth_headers)
+
     def update_document(self, document_id: str, md_path: str) -> Dict[str, Any]:
         """更新已有文档"""
         path = Path(md_path)
         if not path.exists():
             return {"success": False, "message": f"文件不存在: {md_path}"}
 
-        # 读取 MD 文件
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        # 解析 MD 内容
-        parser = MarkdownParser(str(path))
-        blocks = parser.parse(content)
+        # 读取并解析 MD 内容
+        blocks, pending_images, pending_tables = self._load_and_parse(path)
 
         # 清空原内容
         if not self.doc_writer.delete_document_content(document_id):
             return {"success": False, "message": "清空文档原内容失败，已中止更新操作"}
 
         # 写入新内容（包含图片和表格处理）
-        uploaded_images, write_success = self._write_content_with_images(str(path), document_id, blocks, parser.pending_images, parser.pending_tables)
+        uploaded_images, write_success = self._write_content_with_images(str(path), document_id, blocks, pending_images, pending_tables)
 
         return {
             "success": write_success,